@@ -1,15 +1,90 @@
 #!/usr/bin/env python3
 import os
+import threading
+import time
+from functools import lru_cache
 from typing import List
 
 from fastmcp import FastMCP
 from fastmcp.exceptions import ToolError
-from litellm import completion, model_list
-from litellm.utils import get_llm_provider  # type: ignore
 
 # Create the MCP server
 mcp = FastMCP(name="TheVoicesServer")
 
+# Define provider to required API keys mapping (all keys must be present)
+_PROVIDER_KEYS: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("openai", ("OPENAI_API_KEY",)),
+    ("anthropic", ("ANTHROPIC_API_KEY",)),
+    ("vertex_ai", ("VERTEXAI_PROJECT", "VERTEXAI_LOCATION")),
+    ("azure", ("AZURE_API_KEY", "AZURE_API_BASE")),
+    ("cohere", ("COHERE_API_KEY",)),
+    ("huggingface", ("HUGGINGFACE_API_KEY",)),
+    ("replicate", ("REPLICATE_API_TOKEN",)),
+    ("together_ai", ("TOGETHERAI_API_KEY",)),
+    ("openrouter", ("OPENROUTER_API_KEY",)),
+    ("ai21", ("AI21_API_KEY",)),
+    ("palm", ("PALM_API_KEY",)),
+    ("bedrock", ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY")),
+    ("sagemaker", ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY")),
+)
+
+# All environment variables that influence the list of available models
+_ALL_KEYS = tuple(dict.fromkeys(key for _, keys in _PROVIDER_KEYS for key in keys))
+
+# User message sent with every prompt; copied per call since LiteLLM may
+# modify messages in place (e.g. when merging unsupported system messages)
+_USER_MESSAGE = {
+    "role": "user",
+    "content": "Please respond based on the above instructions.",
+}
+
+# Parameters always passed to completion(), even when None
+_REQUIRED_COMPLETION_PARAMS = frozenset({"model", "messages"})
+
+# Cache for list_available_models, invalidated on TTL expiry or env changes
+_MODELS_CACHE = {"key": None, "value": None, "ts": 0.0}
+_DEFAULT_MODELS_CACHE_TTL = 86400.0
+
+
+@lru_cache(maxsize=4)
+def _available_providers(env_snapshot: frozenset[str]) -> frozenset[str]:
+    """Returns the providers whose required API keys are all in env_snapshot."""
+    return frozenset(
+        provider
+        for provider, keys in _PROVIDER_KEYS
+        if all(key in env_snapshot for key in keys)
+    )
+
+
+@lru_cache(maxsize=1)
+def _model_list_by_provider() -> dict[str, list[str]]:
+    """Buckets LiteLLM's model list by inferred provider (computed once)."""
+    from litellm import model_list
+    from litellm.exceptions import BadRequestError
+    from litellm.utils import get_llm_provider  # type: ignore
+
+    buckets: dict[str, list[str]] = {}
+    for model in model_list:
+        try:
+            # Get provider for this model
+            _, provider, _, _ = get_llm_provider(model)
+        except BadRequestError:
+            # get_llm_provider reports every failure as BadRequestError
+            continue
+        buckets.setdefault(provider, []).append(model)
+
+    return buckets
+
+
+def _models_cache_ttl() -> float:
+    """Returns the model list cache TTL in seconds (LITELLM_MODELS_CACHE_TTL)."""
+    try:
+        return float(
+            os.environ.get("LITELLM_MODELS_CACHE_TTL", _DEFAULT_MODELS_CACHE_TTL)
+        )
+    except ValueError:
+        return _DEFAULT_MODELS_CACHE_TTL
+
 
 @mcp.tool
 def list_available_models() -> List[str]:
@@ -19,62 +94,63 @@ def list_available_models() -> List[str]:
     Auto-discovers models from LiteLLM's model list and filters based on available API keys.
 
     Returns:
-    List of model names in LiteLLM format (provider/model-name).
+    List of model names in LiteLLM format (provider/model-name), with the model
+    selected via LITELLM_MODEL (if set) listed first.
     """
-    available_models = []
-
-    # Define provider to API key mapping
-    provider_key_mapping = {
-        "openai": "OPENAI_API_KEY",
-        "anthropic": "ANTHROPIC_API_KEY",
-        "vertex_ai": ["VERTEXAI_PROJECT", "VERTEXAI_LOCATION"],  # Both needed
-        "azure": ["AZURE_API_KEY", "AZURE_API_BASE"],  # Both needed
-        "cohere": "COHERE_API_KEY",
-        "huggingface": "HUGGINGFACE_API_KEY",
-        "replicate": "REPLICATE_API_TOKEN",
-        "together_ai": "TOGETHERAI_API_KEY",
-        "openrouter": "OPENROUTER_API_KEY",
-        "ai21": "AI21_API_KEY",
-        "palm": "PALM_API_KEY",
-        "bedrock": ["AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"],  # AWS credentials
-        "sagemaker": ["AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"],  # AWS credentials
-    }
+    env_get = os.environ.get
+
+    # Snapshot which API keys are set
+    env_snapshot = frozenset(key for key in _ALL_KEYS if env_get(key))
+
+    # Serve from cache while the environment is unchanged and the TTL holds
+    cache_key = (env_snapshot, env_get("LITELLM_MODEL", ""))
+    if (
+        _MODELS_CACHE["key"] == cache_key
+        and time.time() - _MODELS_CACHE["ts"] < _models_cache_ttl()
+    ):
+        return list(_MODELS_CACHE["value"])
+
+    # LiteLLM is heavy to import, so defer loading it until first use
+    import litellm
+
+    # Buckets overlap (e.g. bedrock, azure), so collect into a set
+    available_models = set()
 
     # Check which providers have API keys available
-    available_providers = set()
-
-    for provider, keys in provider_key_mapping.items():
-        if isinstance(keys, list):
-            # All keys in the list must be present
-            if all(os.environ.get(key) for key in keys):
-                available_providers.add(provider)
-        else:
-            # Single key must be present
-            if os.environ.get(keys):
-                available_providers.add(provider)
-
-    # Filter models based on available providers
-    for model in model_list:
-        try:
-            # Get provider for this model
-            _, provider, _, _ = get_llm_provider(model)
+    available_providers = _available_providers(env_snapshot)
+
+    # Collect models from LiteLLM's per-provider buckets
+    models_by_provider = litellm.models_by_provider
+    for provider in available_providers & models_by_provider.keys():
+        prefix = f"{provider}/"
+        available_models.update(
+            model if model.startswith(prefix) else prefix + model
+            for model in models_by_provider[provider]
+        )
 
-            # Check if we have API keys for this provider
-            if provider in available_providers:
-                available_models.append(f"{provider}/{model}")
-        except Exception:
-            # Skip models that can't be processed
-            continue
+    # Fall back to provider inference for providers without a bucket
+    missing_providers = available_providers - models_by_provider.keys()
+    if missing_providers:
+        model_list_by_provider = _model_list_by_provider()
+        for provider in missing_providers:
+            available_models.update(
+                f"{provider}/{model}"
+                for model in model_list_by_provider.get(provider, ())
+            )
+
+    # Sort alphabetically for better readability
+    available_models = sorted(available_models)
 
-    # Add currently selected model if set
-    current_model = os.environ.get("LITELLM_MODEL")
+    # Pin currently selected model to the top if set
+    current_model = env_get("LITELLM_MODEL")
     if current_model:
-        available_models.insert(0, current_model)
+        available_models = [current_model] + [
+            m for m in available_models if m != current_model
+        ]
 
-    # Sort alphabetically for better readability
-    available_models.sort()
+    _MODELS_CACHE.update(key=cache_key, value=available_models, ts=time.time())
 
-    return available_models
+    return list(available_models)
 
 
 @mcp.tool
@@ -224,54 +300,80 @@ def ask_the_voice(
     - LLM API failures or timeouts
     - Malformed responses from the language model
     """
+    env_get = os.environ.get
+
     # Determine which LLM model to use
-    selected_model = model or os.environ.get("LITELLM_MODEL")
+    selected_model = model or env_get("LITELLM_MODEL")
     if not selected_model:
         raise ToolError(
             "Missing environment variable: LITELLM_MODEL and no model parameter provided"
         )
 
     # Construct the prompt
-    prompt = (
-        f"You are '{role_title}'\n\n"
-        "# Role Description\n\n"
-        f"{role_description}\n\n"
-        "# Context\n\n"
-        f"{context}\n\n"
-        "# Task\n\n"
-        f"{task}"
+    prompt = "\n\n".join(
+        (
+            f"You are '{role_title}'",
+            "# Role Description",
+            role_description,
+            "# Context",
+            context,
+            "# Task",
+            task,
+        )
     )
 
     # Call the LLM via LiteLLM
+    from litellm import completion
+
+    completion_params = {
+        "model": selected_model,
+        "messages": [{"role": "system", "content": prompt}, dict(_USER_MESSAGE)],
+        "temperature": temperature,
+    }
+
     try:
-        completion_params = {
-            "model": selected_model,
-            "messages": [
-                {"role": "system", "content": prompt},
-                {
-                    "role": "user",
-                    "content": "Please respond based on the above instructions.",
-                },
-            ],
-        }
-
-        # Add temperature if provided
-        if temperature is not None:
-            completion_params["temperature"] = temperature
-
-        response = completion(**completion_params)
+        # Only pass optional parameters that were provided
+        response = completion(
+            **{
+                k: v
+                for k, v in completion_params.items()
+                if v is not None or k in _REQUIRED_COMPLETION_PARAMS
+            }
+        )
     except Exception as e:
         raise ToolError(f"LLM request failed: {e}")
 
     # Extract and return the generated content
+    choices = getattr(response, "choices", None)
+    if not choices:
+        raise ToolError("Unexpected response format: no choices")
+    message = getattr(choices[0], "message", None)
+    if message is None:
+        raise ToolError("Unexpected response format: no message")
+    content = getattr(message, "content", None)
+    return content if content is not None else ""
+
+
+def _warm_up():
+    """Imports LiteLLM ahead of the first tool call."""
     try:
-        content = response.choices[0].message.content  # type: ignore
-        return content if content is not None else ""
-    except (AttributeError, IndexError) as e:
-        raise ToolError(f"Unexpected response format: {e}")
+        import litellm
+        import litellm.utils
+
+        # Only prebuild the fallback buckets if this environment needs them
+        env_snapshot = frozenset(key for key in _ALL_KEYS if os.environ.get(key))
+        if _available_providers(env_snapshot) - litellm.models_by_provider.keys():
+            _model_list_by_provider()
+    except Exception:
+        # Tools import LiteLLM themselves and will report any failure
+        pass
 
 
 def run():
+    # Warm up LiteLLM while the MCP handshake is in progress
+    no_warmup = os.environ.get("THE_VOICES_NO_WARMUP", "").strip().lower()
+    if no_warmup not in ("1", "true", "yes", "on"):
+        threading.Thread(target=_warm_up, daemon=True).start()
     mcp.run()
 
 